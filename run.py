@@ -2,48 +2,135 @@
 Reads .csv, enrich each row with full address and GPS via Google Places API,
 and write a GeoJSON file.
 Requires: GOOGLE_PLACES_API_KEY in environment (Places API and Geocoding API enabled).
+Usage: python run.py [--input places.csv] [--output places.geojson]
+(file dialogs are shown for any path not given on the command line).
 """
 
+import argparse
 import csv
+import hashlib
 import json
 import os
 import re
+import sqlite3
+import threading
 import time
-from datetime import datetime, timezone
-from urllib.parse import quote_plus
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from urllib.parse import quote_plus, unquote_plus
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
 except ImportError:
     raise SystemExit("Install requests: pip install requests")
 
 try:
-    import tkinter as tk
-    from tkinter import filedialog
+    import httpx  # optional, HTTP/2 multiplexing of all requests over one connection
+    import h2  # noqa: F401 (needed by httpx for http2=True)
 except ImportError:
-    raise SystemExit("tkinter is required for file dialogs (usually included with Python).")
+    httpx = None
+
+try:
+    import orjson  # optional, faster JSON parsing and serialization
+except ImportError:
+    orjson = None
 
 # -----------------------------------------------------------------------------
 # Config
 # -----------------------------------------------------------------------------
 BASE_PLACES_URL = "https://maps.googleapis.com/maps/api/place"
 GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
-REQUEST_DELAY_S = 0.2  # avoid rate limits
+MAX_QPS = 10  # global cap on API requests per second, shared by all workers
+MAX_WORKERS = 8  # rows looked up concurrently
 API_REQUEST_LIMIT = 1000  # max API requests per run (Find Place + Place Details)
+HTTP_POOL_MAXSIZE = 16  # keep-alive connections kept open to maps.googleapis.com, per session
+HTTP_RETRIES = 3  # retries on connection errors (transport level, both HTTP backends)
+API_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)  # rate limited or transient server error
+API_RETRIES = 5  # retries after those statuses / OVER_QUERY_LIMIT, backing off 1, 2, 4... s
+API_MAX_BACKOFF_S = 30
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "places_cache.sqlite")
+CACHE_TTL_DAYS = 30  # cached lookups older than this are fetched again
+NO_LOCATION_COMMENT = "No location information is available for this saved place"
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+# "/place/<name>" path segment, "!1s0x...:0x..." place reference, or an explicit Places API
+# place_id ("query_place_id=..." or "q=place_id:...") in a Google Maps URL
+_MAPS_URL_RE = re.compile(
+    r"/place/([^/?]+)"
+    r"|!1s(0x[0-9a-fA-F]+:0x[0-9a-fA-F]+)"
+    r"|(?:[?&]query_place_id=|place_id(?::|%3[aA]))([A-Za-z0-9_-]+)"
+)
+# Google Maps on any Google domain (google.com/maps, www.google.nl/maps, google.co.uk/maps...)
+_GOOGLE_MAPS_RE = re.compile(r"google\.[a-z.]+/maps")
+# Bare "lat,lng" (dropped pins): in a /maps/search/ path or q= parameter, or as the title
+_COORDS_URL_RE = re.compile(
+    r"(?:/maps/search/|[?&]q=)(-?\d{1,2}(?:\.\d+)?)(?:,|%2[cC])(?:\+|%20)*(-?\d{1,3}(?:\.\d+)?)(?:[/?&]|$)"
+)
+_COORDS_TEXT_RE = re.compile(r"\s*(-?\d{1,2}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*")
 
 # -----------------------------------------------------------------------------
-# Extract place reference from Google Maps URL (optional, for future use)
+# Parse Google Maps URLs
 # -----------------------------------------------------------------------------
+def parse_maps_url(url):
+    """Return (place name, 0x...:0x... place reference, place_id) from a Google Maps URL.
+
+    Each item is None when not present in the URL.
+    """
+    name = ref = place_id = None
+    if url and _GOOGLE_MAPS_RE.search(url):
+        for m in _MAPS_URL_RE.finditer(url):
+            if m.group(1) and name is None:
+                name = unquote_plus(m.group(1)).strip() or None
+            elif m.group(2) and ref is None:
+                ref = m.group(2)
+            elif m.group(3) and place_id is None:
+                place_id = m.group(3)
+    return name, ref, place_id
+
+
+def extract_coordinates(title, url):
+    """Return (lat, lng) for rows that are just a dropped pin, or None.
+
+    Such rows have no name or address for the Places API to search for, so their
+    coordinates are taken directly from the URL. A "lat,lng" title is only used when the
+    URL has no place name or place_id, since those identify the place better.
+    """
+    m = _COORDS_URL_RE.search(url) if url else None
+    if not m and title:
+        name, _, place_id = parse_maps_url(url)
+        if not name and not place_id:
+            m = _COORDS_TEXT_RE.fullmatch(title)
+    if not m:
+        return None
+    lat, lng = float(m.group(1)), float(m.group(2))
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
 def extract_place_ref_from_url(url):
     """Extract the 0x...:0x... token from a Google Maps place URL, if present."""
-    if not url or "google.com/maps" not in url:
-        return None
-    m = re.search(r"!1s(0x[0-9a-fA-F]+:0x[0-9a-fA-F]+)", url)
-    return m.group(1) if m else None
+    return parse_maps_url(url)[1]
+
+
+def import_tkinter():
+    """Import tkinter only when a file dialog is needed, so headless runs work without it."""
+    try:
+        import tkinter as tk
+        from tkinter import filedialog
+    except ImportError:
+        raise SystemExit(
+            "tkinter is required for file dialogs (usually included with Python). "
+            "Pass --input and --output to run without it."
+        )
+    return tk, filedialog
 
 
 def ask_input_csv_path():
     """Show an open-file dialog to select the input CSV. Returns path or None if cancelled."""
+    tk, filedialog = import_tkinter()
     root = tk.Tk()
     root.withdraw()
     root.attributes("-topmost", True)
@@ -59,6 +146,7 @@ def ask_input_csv_path():
 
 def ask_output_geojson_path(initial_dir=None, suggested_name="Favourite places.geojson"):
     """Show a save-file dialog to choose the output GeoJSON. Returns path or None if cancelled."""
+    tk, filedialog = import_tkinter()
     root = tk.Tk()
     root.withdraw()
     root.attributes("-topmost", True)
@@ -73,6 +161,141 @@ def ask_output_geojson_path(initial_dir=None, suggested_name="Favourite places.g
     return path if path else None
 
 
+class RateLimiter:
+    """Thread-safe token bucket shared by all workers.
+
+    Requests go out immediately while tokens are available (up to `burst` at once) and
+    only wait once the sustained rate would exceed max_qps. pause() blocks every worker,
+    used when Google signals that we are over the rate limit.
+    """
+
+    def __init__(self, max_qps, burst=None):
+        self.rate = max_qps
+        self.burst = burst or max_qps
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class RequestBudget:
+    """Thread-safe counter enforcing API_REQUEST_LIMIT across all workers."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.count = 0
+        self.limit_reached = False
+        self.lock = threading.Lock()
+
+    def take(self):
+        """Reserve one request. Returns False (and records it) once the limit is reached."""
+        with self.lock:
+            if self.count >= self.limit:
+                self.limit_reached = True
+                return False
+            self.count += 1
+            return True
+
+
+class PlacesCache:
+    """On-disk cache of Find Place (by normalized query) and Place Details (by place_id) results.
+
+    Only successful lookups are stored, so rows that failed are retried on the next run.
+    Entries older than ttl_days are ignored and purged on open.
+    """
+
+    def __init__(self, path, ttl_days):
+        self.ttl_s = ttl_days * 86400
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS findplace (query_hash TEXT PRIMARY KEY, json_blob TEXT, ts REAL)"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS details (place_id TEXT PRIMARY KEY, json_blob TEXT, ts REAL)"
+            )
+            oldest = time.time() - self.ttl_s
+            self.db.execute("DELETE FROM findplace WHERE ts < ?", (oldest,))
+            self.db.execute("DELETE FROM details WHERE ts < ?", (oldest,))
+
+    @staticmethod
+    def _query_hash(query):
+        return hashlib.sha1(query.encode("utf-8")).hexdigest()
+
+    def _get(self, sql, key):
+        with self.lock:
+            row = self.db.execute(sql, (key, time.time() - self.ttl_s)).fetchone()
+        return row[0] if row else None
+
+    def _put(self, sql, key, value):
+        with self.lock, self.db:
+            self.db.execute(sql, (key, value, time.time()))
+
+    def get_place(self, query):
+        blob = self._get(
+            "SELECT json_blob FROM findplace WHERE query_hash = ? AND ts >= ?", self._query_hash(query)
+        )
+        return json.loads(blob) if blob else None
+
+    def put_place(self, query, place):
+        self._put(
+            "INSERT OR REPLACE INTO findplace VALUES (?, ?, ?)", self._query_hash(query), json.dumps(place)
+        )
+
+    def get_details(self, place_id):
+        blob = self._get("SELECT json_blob FROM details WHERE place_id = ? AND ts >= ?", place_id)
+        return json.loads(blob) if blob else None
+
+    def put_details(self, place_id, details):
+        self._put("INSERT OR REPLACE INTO details VALUES (?, ?, ?)", place_id, json.dumps(details))
+
+    def close(self):
+        self.db.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--input", help="input CSV (default: choose in a file dialog)")
+    parser.add_argument("--output", help="output GeoJSON (default: choose in a file dialog)")
+    parser.add_argument(
+        "--ttl-days",
+        type=float,
+        default=CACHE_TTL_DAYS,
+        help=f"re-fetch cached lookups older than this many days (default: {CACHE_TTL_DAYS})",
+    )
+    parser.add_argument(
+        "--with-country",
+        action="store_true",
+        help="add country_code to each place (one extra Place Details request per place)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="keep located places from an existing output file and only look up the rest",
+    )
+    return parser.parse_args()
+
+
 def get_api_key():
     key = os.environ.get("GOOGLE_PLACES_API_KEY") or os.environ.get("GOOGLE_MAPS_API_KEY")
     if not key:
@@ -83,50 +306,113 @@ def get_api_key():
     return key
 
 
-def find_place_id(api_key, title, maps_url):
-    """Use Find Place from Text to get place_id for the given title; prefer text from URL if useful."""
+def make_session():
+    """Create an HTTP session whose connections are reused across requests (Keep-Alive)."""
+    session = requests.Session()
+    # HTTP status retries are done by places_api_get, the same way for both backends
+    retry = Retry(total=HTTP_RETRIES, backoff_factor=0.5, allowed_methods=["GET"])
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
+
+
+class ThreadLocalSessions:
+    """One HTTP session per worker thread, since requests.Session is not guaranteed thread-safe."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.local = threading.local()
+        self.sessions = []
+        self.lock = threading.Lock()
+
+    def get(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = self.factory()
+            with self.lock:
+                self.sessions.append(session)
+        return session
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions:
+                session.close()
+            self.sessions.clear()
+
+
+class SharedSession:
+    """A single thread-safe HTTP client used by every worker."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self):
+        return self.client
+
+    def close(self):
+        self.client.close()
+
+
+def make_sessions():
+    """HTTP clients for the workers.
+
+    With httpx[http2] installed, all workers share one HTTP/2 client that multiplexes
+    requests over a single connection. Otherwise each worker gets its own requests session.
+    """
+    if httpx is not None:
+        transport = httpx.HTTPTransport(
+            http2=True,
+            retries=HTTP_RETRIES,
+            limits=httpx.Limits(max_connections=MAX_WORKERS, max_keepalive_connections=1),
+        )
+        return SharedSession(httpx.Client(transport=transport, timeout=10.0))
+    return ThreadLocalSessions(make_session)
+
+
+def extract_place_id_from_url(url):
+    """Extract a Places API place_id from a Google Maps URL, if present."""
+    return parse_maps_url(url)[2]
+
+
+def place_query(title, maps_url):
+    """Text to search for: the place name from the URL if useful, otherwise the title."""
     # Prefer the decoded place name from the URL path (e.g. "Westdam 59") for accuracy
-    name_from_url = None
-    if maps_url and "/place/" in maps_url:
-        try:
-            path = maps_url.split("?")[0]
-            part = path.split("/place/")[-1].split("/data=")[0]
-            if part:
-                name_from_url = part.replace("+", " ").strip()
-        except Exception:
-            pass
-    query = (name_from_url or title or "").strip()
-    if not query:
-        return None
-    url = f"{BASE_PLACES_URL}/findplacefromtext/json"
-    params = {
-        "key": api_key,
-        "input": query,
-        "inputtype": "textquery",
-        "fields": "place_id",
-    }
-    r = requests.get(url, params=params, timeout=10)
-    r.raise_for_status()
-    data = r.json()
-    if data.get("status") != "OK" or not data.get("candidates"):
-        return None
-    return data["candidates"][0].get("place_id")
+    name_from_url = parse_maps_url(maps_url)[0]
+    return (name_from_url or title or "").strip()
 
 
-def get_place_details(api_key, place_id):
-    """Fetch geometry (lat/lng) and formatted_address for a place_id."""
-    url = f"{BASE_PLACES_URL}/details/json"
-    params = {
-        "key": api_key,
-        "place_id": place_id,
-        "fields": "geometry,formatted_address,name,address_components",
-    }
-    r = requests.get(url, params=params, timeout=10)
+def retry_after_seconds(response, attempt):
+    """Backoff before retrying a failed request: Retry-After if given, else 2**attempt."""
+    try:
+        delay = float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        delay = 2 ** attempt
+    return min(max(delay, 0), API_MAX_BACKOFF_S)
+
+
+def places_api_get(session, limiter, url, params):
+    """GET a Places API endpoint and return the decoded JSON.
+
+    Waits for the shared limiter before each attempt. On HTTP 429, a transient 5xx or an
+    OVER_QUERY_LIMIT status, all workers are paused and the request is retried up to
+    API_RETRIES times, whichever HTTP backend is in use.
+    """
+    for attempt in range(API_RETRIES + 1):
+        limiter.wait()
+        r = session.get(url, params=params, timeout=10)
+        if r.status_code not in API_RETRY_STATUS_CODES:
+            r.raise_for_status()
+            data = load_json_bytes(r.content)
+            if data.get("status") != "OVER_QUERY_LIMIT":
+                return data
+        if attempt < API_RETRIES:
+            limiter.pause(retry_after_seconds(r, attempt))
     r.raise_for_status()
-    data = r.json()
-    if data.get("status") != "OK":
-        return None
-    result = data.get("result", {})
+    return data
+
+
+def parse_place_result(result):
+    """Extract lat/lng, address, name and country code from a Places API result, or None."""
     geom = result.get("geometry")
     if not geom or "location" not in geom:
         return None
@@ -136,7 +422,7 @@ def get_place_details(api_key, place_id):
         return None
     address = result.get("formatted_address") or ""
     name = result.get("name") or ""
-    # Optional: country code from address_components
+    # Optional: country code from address_components (Place Details only)
     country_code = None
     for comp in result.get("address_components") or []:
         if "country" in (comp.get("types") or []):
@@ -151,15 +437,170 @@ def get_place_details(api_key, place_id):
     }
 
 
-def build_feature(row, details, now_iso):
-    """Build one GeoJSON Feature in the same structure as Saved Places.json."""
-    title = (row.get("Title") or "").strip()
-    url = (row.get("URL") or "").strip()
+def find_place_full(session, limiter, api_key, query):
+    """Use Find Place from Text to get the place_id, location, address and name in one call.
+
+    Returns a dict shaped like get_place_details() plus "place_id", or None if nothing was
+    found. If the candidate has no usable geometry, only "place_id" is set.
+    """
+    url = f"{BASE_PLACES_URL}/findplacefromtext/json"
+    params = {
+        "key": api_key,
+        "input": query,
+        "inputtype": "textquery",
+        # All Basic Data fields: billed at the Find Place request SKU with no data surcharge.
+        # address_components is not available from Find Place.
+        "fields": "place_id,geometry/location,formatted_address,name",
+    }
+    data = places_api_get(session, limiter, url, params)
+    if data.get("status") != "OK" or not data.get("candidates"):
+        return None
+    candidate = data["candidates"][0]
+    place_id = candidate.get("place_id")
+    if not place_id:
+        return None
+    place = parse_place_result(candidate) or {}
+    place["place_id"] = place_id
+    return place
+
+
+def get_place_details(session, limiter, api_key, place_id):
+    """Fetch geometry (lat/lng), formatted_address and country code for a place_id."""
+    url = f"{BASE_PLACES_URL}/details/json"
+    params = {
+        "key": api_key,
+        "place_id": place_id,
+        # All Basic Data fields. address_components is only used for the country code, but is
+        # kept so cached details are complete whether or not --with-country was given.
+        "fields": "geometry/location,formatted_address,name,address_components",
+    }
+    data = places_api_get(session, limiter, url, params)
+    if data.get("status") != "OK":
+        return None
+    return parse_place_result(data.get("result", {}))
+
+
+def normalize_query(query):
+    """Normalize a search query for use as a cache key: lowercase, no punctuation, single spaces."""
+    return " ".join(_PUNCTUATION_RE.sub(" ", query.lower()).split())
+
+
+class PlacesClient:
+    """Places API lookups for one run, with request budget, throttling and caching.
+
+    Results are memoized in memory by normalized query and place_id, so duplicate
+    rows cost one lookup even when they are processed concurrently, and stored in
+    the on-disk cache for later runs. Cache hits do not count against the budget.
+    """
+
+    def __init__(self, api_key, sessions, limiter, budget, cache, with_country=False):
+        self.api_key = api_key
+        self.sessions = sessions
+        self.limiter = limiter
+        self.budget = budget
+        self.cache = cache
+        self.with_country = with_country
+        self.lock = threading.Lock()
+        self.places = {}
+        self.details = {}
+
+    def _memoized(self, memo, key, fetch):
+        """Return memo[key], calling fetch() once per key; concurrent callers wait for it."""
+        with self.lock:
+            future = memo.get(key)
+            owner = future is None
+            if owner:
+                future = memo[key] = Future()
+        if owner:
+            try:
+                future.set_result(fetch())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def find_place(self, query):
+        key = normalize_query(query)
+        return self._memoized(self.places, key, lambda: self._fetch_place(key, query))
+
+    def _fetch_place(self, key, query):
+        place = self.cache.get_place(key)
+        if place or not self.budget.take():
+            return place
+        place = find_place_full(self.sessions.get(), self.limiter, self.api_key, query)
+        if place:
+            self.cache.put_place(key, place)
+        return place
+
+    def get_place_details(self, place_id):
+        return self._memoized(self.details, place_id, lambda: self._fetch_details(place_id))
+
+    def _fetch_details(self, place_id):
+        details = self.cache.get_details(place_id)
+        if details or not self.budget.take():
+            return details
+        details = get_place_details(self.sessions.get(), self.limiter, self.api_key, place_id)
+        if details:
+            self.cache.put_details(place_id, details)
+        return details
+
+    def lookup(self, title, maps_url):
+        """Resolve a CSV row to place details (or None).
+
+        A place_id in the URL goes straight to Place Details, and dropped pins are resolved
+        from their coordinates without any request. Otherwise Find Place already returns
+        location, address and name; Place Details is only called when the country code is
+        wanted or Find Place had no geometry.
+        """
+        place_id = extract_place_id_from_url(maps_url)
+        if place_id:
+            return self.get_place_details(place_id)
+        coords = extract_coordinates(title, maps_url)
+        if coords:
+            return {"lat": coords[0], "lng": coords[1], "address": "", "name": title, "country_code": None}
+        query = place_query(title, maps_url)
+        if not query:
+            return None
+        place = self.find_place(query)
+        if not place:
+            return None
+        if "lat" in place and not self.with_country:
+            return place
+        return self.get_place_details(place["place_id"]) or (place if "lat" in place else None)
+
+
+def lookup_row(client, row):
+    """Look up one (title, url) row and return its place details or None. Runs on a worker thread."""
+    title, url = row
+    return client.lookup(title, url)
+
+
+def feature_url(title, url):
+    """google_maps_url written for a located row; also the key used by --resume."""
+    return url or f"http://maps.google.com/?q={quote_plus(title)}"
+
+
+def iter_features(rows, all_details, done, now_iso):
+    """Yield one Feature per row, in row order, printing progress from the calling thread.
+
+    Rows found in done (from --resume) reuse that feature; the others take the next
+    result from all_details, which holds the lookups for exactly those rows, in order.
+    """
+    for title, url in rows:
+        print(f"Processing: {title or url or '(no title/url)'}")
+        feature = done.get(feature_url(title, url))
+        yield feature or build_feature(title, url, next(all_details), now_iso)
+
+
+def build_feature(title, url, details, now_iso):
+    """Build one GeoJSON Feature in the same structure as Saved Places.json.
+
+    title and url are the already-stripped CSV values.
+    """
     if details:
         coords = [details["lng"], details["lat"]]
         props = {
             "date": now_iso,
-            "google_maps_url": url or f"http://maps.google.com/?q={quote_plus(title)}",
+            "google_maps_url": feature_url(title, url),
             "name": details["name"] or title,
             "location": {
                 "address": details["address"],
@@ -172,7 +613,7 @@ def build_feature(row, details, now_iso):
         props = {
             "date": now_iso,
             "google_maps_url": url or "",
-            "Comment": "No location information is available for this saved place",
+            "Comment": NO_LOCATION_COMMENT,
         }
         if title:
             props["name"] = title
@@ -183,12 +624,81 @@ def build_feature(row, details, now_iso):
     }
 
 
+def dump_json_bytes(obj):
+    """Serialize obj to compact UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def load_json_bytes(data):
+    """Parse UTF-8 JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_located_features(path):
+    """Index the located features of an existing GeoJSON file by google_maps_url.
+
+    Features without a location (coordinates [0, 0]) are left out so their rows are
+    looked up again. A file cut short by an interrupted run is read line by line,
+    keeping every complete feature.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        features = load_json_bytes(data)["features"]
+    except (ValueError, KeyError, TypeError):
+        features = []
+        for line in data.splitlines():
+            line = line.strip().rstrip(b",")
+            if not line.startswith(b"{"):
+                continue
+            try:
+                feature = load_json_bytes(line)
+            except ValueError:
+                continue
+            if isinstance(feature, dict) and feature.get("type") == "Feature":
+                features.append(feature)
+    done = {}
+    for feature in features:
+        try:
+            url = feature["properties"]["google_maps_url"]
+            located = feature["geometry"]["coordinates"] != [0, 0]
+        except (KeyError, TypeError):
+            continue
+        if url and located:
+            done[url] = feature
+    return done
+
+
+def write_feature_collection(path, features):
+    """Stream features into a GeoJSON FeatureCollection, one feature per line.
+
+    Features are written as they are produced, so memory use does not grow with
+    the number of rows and an interrupted run leaves the completed rows on disk.
+    Returns the number of features written.
+    """
+    count = 0
+    with open(path, "wb") as f:
+        f.write(b'{"type":"FeatureCollection","features":[\n')
+        for feature in features:
+            if count:
+                f.write(b",\n")
+            f.write(dump_json_bytes(feature))
+            count += 1
+        f.write(b"\n]}\n")
+    return count
+
+
 def main():
-    csv_path = ask_input_csv_path()
+    args = parse_args()
+    csv_path = args.input or ask_input_csv_path()
     if not csv_path:
         print("No input file selected. Exiting.")
         return
-    geojson_path = ask_output_geojson_path(
+    geojson_path = args.output or ask_output_geojson_path(
         initial_dir=os.path.dirname(csv_path),
         suggested_name=os.path.splitext(os.path.basename(csv_path))[0] + ".geojson",
     )
@@ -197,49 +707,51 @@ def main():
         return
 
     api_key = get_api_key()
-    now_iso = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    sessions = make_sessions()
+    now_iso = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
 
-    # Read CSV
+    # Read CSV into (title, url) tuples; only the Title and URL columns are used
     rows = []
     with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+        reader = csv.reader(f)
+        header = next(reader, [])
+        ti = header.index("Title") if "Title" in header else None
+        ui = header.index("URL") if "URL" in header else None
         for row in reader:
-            title = (row.get("Title") or "").strip()
-            url = (row.get("URL") or "").strip()
+            title = row[ti].strip() if ti is not None and ti < len(row) else ""
+            url = row[ui].strip() if ui is not None and ui < len(row) else ""
             if not title and not url:
                 continue
-            rows.append(row)
-
-    features = []
-    request_count = 0
-    limit_reached = False
-    for i, row in enumerate(rows):
-        title = (row.get("Title") or "").strip()
-        url = (row.get("URL") or "").strip()
-        print(f"Processing: {title or url or '(no title/url)'}")
-        details = None
-        if request_count < API_REQUEST_LIMIT:
-            place_id = find_place_id(api_key, title, url)
-            request_count += 1
-            if place_id and request_count < API_REQUEST_LIMIT:
-                time.sleep(REQUEST_DELAY_S)
-                details = get_place_details(api_key, place_id)
-                request_count += 1
-            elif place_id:
-                limit_reached = True
-        else:
-            limit_reached = True
-        if not details and i > 0:
-            time.sleep(REQUEST_DELAY_S)
-        features.append(build_feature(row, details, now_iso))
-
-    fc = {"type": "FeatureCollection", "features": features}
-    with open(geojson_path, "w", encoding="utf-8") as f:
-        json.dump(fc, f, ensure_ascii=False, indent=2)
-
-    print(f"Wrote {len(features)} features to {geojson_path}")
-    if limit_reached:
-        print(f"API request limit reached ({request_count} requests, max {API_REQUEST_LIMIT}). Remaining rows have no location data.")
+            rows.append((title, url))
+
+    done = {}
+    if args.resume and os.path.exists(geojson_path):
+        done = load_located_features(geojson_path)
+        print(f"Resuming: {len(done)} located places kept from {geojson_path}")
+    pending = [row for row in rows if feature_url(*row) not in done]
+
+    # Look up rows concurrently; the API calls are I/O-bound, so threads overlap
+    # the network latency while the limiter keeps the overall QPS bounded.
+    # Workers only do the lookups; features are built and serialized here, in row
+    # order, as the results arrive.
+    limiter = RateLimiter(MAX_QPS)
+    budget = RequestBudget(API_REQUEST_LIMIT)
+    cache = PlacesCache(CACHE_PATH, args.ttl_days)
+    client = PlacesClient(api_key, sessions, limiter, budget, cache, with_country=args.with_country)
+    # When resuming, write next to the existing file and only replace it once complete
+    out_path = geojson_path + ".part" if done else geojson_path
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        all_details = executor.map(partial(lookup_row, client), pending)
+        features = iter_features(rows, all_details, done, now_iso)
+        count = write_feature_collection(out_path, features)
+    cache.close()
+    sessions.close()
+    if out_path != geojson_path:
+        os.replace(out_path, geojson_path)
+
+    print(f"Wrote {count} features to {geojson_path}")
+    if budget.limit_reached:
+        print(f"API request limit reached ({budget.count} requests, max {API_REQUEST_LIMIT}). Remaining rows have no location data.")
 
 
 if __name__ == "__main__":